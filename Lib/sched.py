@@ -24,7 +24,7 @@ has another way to reference private data (besides global variables).
 """
 
 import time
-import heapq
+from heapq import heapify, heappop, heappush
 from collections import namedtuple
 from itertools import count
 import threading
@@ -50,11 +50,28 @@ _sentinel = object()
 
 class scheduler:
 
-    def __init__(self, timefunc=_time, delayfunc=time.sleep):
+    def __init__(self, timefunc=_time, delayfunc=time.sleep, *, lock=None):
         """Initialize a new instance, passing the time and delay
-        functions"""
+        functions.
+
+        By default the queue is protected by a reentrant lock so the
+        scheduler can be shared between threads.  Single-threaded
+        applications can avoid the locking overhead by passing a no-op
+        context manager (e.g. contextlib.nullcontext()) as *lock*.
+        """
         self._queue = []
-        self._lock = threading.RLock()
+        # Pending events by id(), used for O(1) membership checks.  Events
+        # are removed from the heap lazily: cancel() only records the id
+        # here and in _cancelled, and run() discards cancelled entries when
+        # they surface at the top of the heap.
+        self._pending = {}
+        self._cancelled = set()
+        # Bumped whenever the set of pending events changes; lets the
+        # queue property reuse its last sorted snapshot between changes.
+        self._version = 0
+        self._queue_cache = ()
+        self._cache_version = -1
+        self._lock = threading.RLock() if lock is None else lock
         self.timefunc = timefunc
         self.delayfunc = delayfunc
         self._sequence_generator = count()
@@ -72,7 +89,9 @@ class scheduler:
         with self._lock:
             event = Event(time, priority, next(self._sequence_generator),
                           action, argument, kwargs)
-            heapq.heappush(self._queue, event)
+            self._pending[id(event)] = event
+            heappush(self._queue, event)
+            self._version += 1
         return event # The ID
 
     def enter(self, delay, priority, action, argument=(), kwargs=_sentinel):
@@ -92,13 +111,25 @@ class scheduler:
 
         """
         with self._lock:
-            self._queue.remove(event)
-            heapq.heapify(self._queue)
+            try:
+                del self._pending[id(event)]
+            except KeyError:
+                raise ValueError('event not in queue') from None
+            # Lazy deletion: leave the event in the heap and have run()
+            # (or the rebuild below) drop it later.  This keeps cancel()
+            # O(1) instead of the O(n) remove + heapify.
+            self._cancelled.add(id(event))
+            self._version += 1
+            if len(self._cancelled) > len(self._queue) // 2:
+                # Too much dead weight; rebuild the heap in place.
+                self._queue[:] = self._pending.values()
+                heapify(self._queue)
+                self._cancelled.clear()
 
     def empty(self):
         """Check whether the queue is empty."""
         with self._lock:
-            return not self._queue
+            return not self._pending
 
     def run(self, blocking=True):
         """Execute events until the queue is empty.
@@ -121,35 +152,45 @@ class scheduler:
         A questionable hack is added to allow other threads to run:
         just after an event is executed, a delay of 0 is executed, to
         avoid monopolizing the CPU when other threads are also
-        runnable.
+        runnable.  The zero delay (a syscall per event with
+        time.sleep) is skipped while no other thread is alive.
 
         """
         # localize variable access to minimize overhead
         # and to improve thread safety
         lock = self._lock
         q = self._queue
+        pending = self._pending
+        cancelled = self._cancelled
         delayfunc = self.delayfunc
         timefunc = self.timefunc
-        pop = heapq.heappop
+        pop = heappop
+        active_count = threading.active_count
         while True:
             with lock:
+                while q and id(q[0]) in cancelled:
+                    cancelled.discard(id(pop(q)))
                 if not q:
                     break
+                event = q[0]
                 (time, priority, sequence, action,
-                 argument, kwargs) = q[0]
+                 argument, kwargs) = event
                 now = timefunc()
                 if time > now:
                     delay = True
                 else:
                     delay = False
                     pop(q)
+                    del pending[id(event)]
+                    self._version += 1
             if delay:
                 if not blocking:
                     return time - now
                 delayfunc(time - now)
             else:
                 action(*argument, **kwargs)
-                delayfunc(0)   # Let other threads run
+                if active_count() > 1:
+                    delayfunc(0)   # Let other threads run
 
     @property
     def queue(self):
@@ -159,9 +200,16 @@ class scheduler:
             time, priority, action, arguments, kwargs
 
         """
-        # Use heapq to sort the queue rather than using 'sorted(self._queue)'.
-        # With heapq, two events scheduled at the same time will show in
-        # the actual order they would be retrieved.
+        # The sequence field breaks ties between events scheduled at the
+        # same time, so sorted() yields exactly the retrieval order and
+        # runs at C speed instead of a Python-level heappop loop.
         with self._lock:
-            events = self._queue[:]
-        return list(map(heapq.heappop, [events]*len(events)))
+            if self._cache_version != self._version:
+                if self._cancelled:
+                    events = sorted(e for e in self._queue
+                                    if id(e) not in self._cancelled)
+                else:
+                    events = sorted(self._queue)
+                self._queue_cache = tuple(events)
+                self._cache_version = self._version
+            return list(self._queue_cache)
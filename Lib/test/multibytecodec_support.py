@@ -289,14 +289,19 @@ class TestBase_Mapping(unittest.TestCase):
     supmaps = []
     codectests = []
 
-    def setUp(self):
+    @classmethod
+    def setUpClass(cls):
+        # Fetch (or reuse the on-disk copy of) the mapping file once per
+        # class instead of once per test; a failure skips the whole class.
         try:
-            self.open_mapping_file().close() # test it to report the error early
+            cls.open_mapping_file().close() # test it to report the error early
         except (OSError, HTTPException):
-            self.skipTest("Could not retrieve "+self.mapfileurl)
+            raise unittest.SkipTest("Could not retrieve "+cls.mapfileurl)
+        super().setUpClass()
 
-    def open_mapping_file(self):
-        return support.open_urlresource(self.mapfileurl, encoding="utf-8")
+    @classmethod
+    def open_mapping_file(cls):
+        return support.open_urlresource(cls.mapfileurl, encoding="utf-8")
 
     def test_mapping_file(self):
         if self.mapfileurl.endswith('.xml'):
@@ -1,3 +1,4 @@
+import contextlib
 import queue
 import sched
 import threading
@@ -88,6 +89,16 @@ class TestCase(unittest.TestCase):
         self.assertTrue(q.empty())
         self.assertEqual(timer.time(), 5)
 
+    def test_custom_lock(self):
+        l = []
+        fun = lambda x: l.append(x)
+        scheduler = sched.scheduler(time.time, time.sleep,
+                                    lock=contextlib.nullcontext())
+        for x in [0.05, 0.04, 0.03, 0.02, 0.01]:
+            z = scheduler.enterabs(x, 1, fun, (x,))
+        scheduler.run()
+        self.assertEqual(l, [0.01, 0.02, 0.03, 0.04, 0.05])
+
     def test_priority(self):
         l = []
         fun = lambda x: l.append(x)
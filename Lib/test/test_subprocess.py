@@ -72,6 +72,27 @@ NONEXISTING_ERRORS = (FileNotFoundError, NotADirectoryError, PermissionError)
 ZERO_RETURN_CMD = (sys.executable, '-c', 'pass')
 
 
+def scratch_file():
+    # An anonymous RAM-backed file for tests that only need fd semantics,
+    # skipping the inode allocation and unlink of a real temporary file.
+    # memfd_create can exist yet still fail at runtime (sandboxes, old
+    # kernels), hence the fallback.
+    if hasattr(os, 'memfd_create'):
+        try:
+            return os.fdopen(os.memfd_create("test_subprocess"), "w+b")
+        except OSError:
+            pass
+    return tempfile.TemporaryFile()
+
+
+def env_copy_with(**overrides):
+    # A plain-dict copy of os.environ with *overrides* applied, for the
+    # many tests that pass the current environment plus one key.  Taken
+    # per call on purpose: fixtures may change os.environ between tests,
+    # so a cached snapshot could leak stale values.
+    return {**os.environ, **overrides}
+
+
 def setUpModule():
     shell_true = shutil.which('true')
     if shell_true is None:
@@ -200,7 +221,7 @@ class ProcessTestCase(BaseTestCase):
 
     def test_check_output_stdin_arg(self):
         # check_output() can be called with stdin set to a file
-        tf = tempfile.TemporaryFile()
+        tf = scratch_file()
         self.addCleanup(tf.close)
         tf.write(b'pear')
         tf.seek(0)
@@ -257,7 +278,7 @@ class ProcessTestCase(BaseTestCase):
 
     def test_check_output_stdin_with_input_arg(self):
         # check_output() refuses to accept 'stdin' with 'input'
-        tf = tempfile.TemporaryFile()
+        tf = scratch_file()
         self.addCleanup(tf.close)
         tf.write(b'pear')
         tf.seek(0)
@@ -287,8 +308,7 @@ class ProcessTestCase(BaseTestCase):
 
     def test_call_kwargs(self):
         # call() function with keyword args
-        newenv = os.environ.copy()
-        newenv["FRUIT"] = "banana"
+        newenv = env_copy_with(FRUIT="banana")
         rc = subprocess.call([sys.executable, "-c",
                               'import sys, os;'
                               'sys.exit(os.getenv("FRUIT")=="banana")'],
@@ -411,6 +431,17 @@ class ProcessTestCase(BaseTestCase):
         with os_helper.change_cwd(cwd):
             return os.getcwd()
 
+    # For use in the test_cwd* tests below.  The normalized temporary
+    # directory never changes within a run, so compute it once instead of
+    # paying _normalize_cwd's chdir round trip in every test that needs it.
+    _temp_dir = None
+
+    def _normalized_temp_dir(self):
+        if ProcessTestCase._temp_dir is None:
+            ProcessTestCase._temp_dir = self._normalize_cwd(
+                tempfile.gettempdir())
+        return ProcessTestCase._temp_dir
+
     # For use in the test_cwd* tests below.
     def _split_python_path(self):
         # Return normalized (python_dir, python_base).
@@ -439,18 +470,15 @@ class ProcessTestCase(BaseTestCase):
 
     def test_cwd(self):
         # Check that cwd changes the cwd for the child process.
-        temp_dir = tempfile.gettempdir()
-        temp_dir = self._normalize_cwd(temp_dir)
+        temp_dir = self._normalized_temp_dir()
         self._assert_cwd(temp_dir, sys.executable, cwd=temp_dir)
 
     def test_cwd_with_bytes(self):
-        temp_dir = tempfile.gettempdir()
-        temp_dir = self._normalize_cwd(temp_dir)
+        temp_dir = self._normalized_temp_dir()
         self._assert_cwd(temp_dir, sys.executable, cwd=os.fsencode(temp_dir))
 
     def test_cwd_with_pathlike(self):
-        temp_dir = tempfile.gettempdir()
-        temp_dir = self._normalize_cwd(temp_dir)
+        temp_dir = self._normalized_temp_dir()
         self._assert_cwd(temp_dir, sys.executable, cwd=FakePath(temp_dir))
 
     @unittest.skipIf(mswindows, "pending resolution of issue #15533")
@@ -532,7 +560,7 @@ class ProcessTestCase(BaseTestCase):
 
     def test_stdin_filedes(self):
         # stdin is set to open file descriptor
-        tf = tempfile.TemporaryFile()
+        tf = scratch_file()
         self.addCleanup(tf.close)
         d = tf.fileno()
         os.write(d, b"pear")
@@ -545,7 +573,7 @@ class ProcessTestCase(BaseTestCase):
 
     def test_stdin_fileobj(self):
         # stdin is set to open file object
-        tf = tempfile.TemporaryFile()
+        tf = scratch_file()
         self.addCleanup(tf.close)
         tf.write(b"pear")
         tf.seek(0)
@@ -565,7 +593,7 @@ class ProcessTestCase(BaseTestCase):
 
     def test_stdout_filedes(self):
         # stdout is set to open file descriptor
-        tf = tempfile.TemporaryFile()
+        tf = scratch_file()
         self.addCleanup(tf.close)
         d = tf.fileno()
         p = subprocess.Popen([sys.executable, "-c",
@@ -577,7 +605,7 @@ class ProcessTestCase(BaseTestCase):
 
     def test_stdout_fileobj(self):
         # stdout is set to open file object
-        tf = tempfile.TemporaryFile()
+        tf = scratch_file()
         self.addCleanup(tf.close)
         p = subprocess.Popen([sys.executable, "-c",
                           'import sys; sys.stdout.write("orange")'],
@@ -596,7 +624,7 @@ class ProcessTestCase(BaseTestCase):
 
     def test_stderr_filedes(self):
         # stderr is set to open file descriptor
-        tf = tempfile.TemporaryFile()
+        tf = scratch_file()
         self.addCleanup(tf.close)
         d = tf.fileno()
         p = subprocess.Popen([sys.executable, "-c",
@@ -608,7 +636,7 @@ class ProcessTestCase(BaseTestCase):
 
     def test_stderr_fileobj(self):
         # stderr is set to open file object
-        tf = tempfile.TemporaryFile()
+        tf = scratch_file()
         self.addCleanup(tf.close)
         p = subprocess.Popen([sys.executable, "-c",
                           'import sys; sys.stderr.write("strawberry")'],
@@ -652,7 +680,7 @@ class ProcessTestCase(BaseTestCase):
 
     def test_stdout_stderr_file(self):
         # capture stdout and stderr to the same open file
-        tf = tempfile.TemporaryFile()
+        tf = scratch_file()
         self.addCleanup(tf.close)
         p = subprocess.Popen([sys.executable, "-c",
                               'import sys;'
@@ -781,8 +809,7 @@ class ProcessTestCase(BaseTestCase):
                 proc.kill()
 
     def test_env(self):
-        newenv = os.environ.copy()
-        newenv["FRUIT"] = "orange"
+        newenv = env_copy_with(FRUIT="orange")
         with subprocess.Popen([sys.executable, "-c",
                                'import sys,os;'
                                'sys.stdout.write(os.getenv("FRUIT"))'],
@@ -793,11 +820,8 @@ class ProcessTestCase(BaseTestCase):
 
     @unittest.skipUnless(sys.platform == "win32", "Windows only issue")
     def test_win32_duplicate_envs(self):
-        newenv = os.environ.copy()
-        newenv["fRUit"] = "cherry"
-        newenv["fruit"] = "lemon"
-        newenv["FRUIT"] = "orange"
-        newenv["frUit"] = "banana"
+        newenv = env_copy_with(fRUit="cherry", fruit="lemon",
+                               FRUIT="orange", frUit="banana")
         with subprocess.Popen(["CMD", "/c", "SET", "fruit"],
                               stdout=subprocess.PIPE,
                               env=newenv) as p:
@@ -867,26 +891,22 @@ class ProcessTestCase(BaseTestCase):
 
     def test_invalid_env(self):
         # null character in the environment variable name
-        newenv = os.environ.copy()
-        newenv["FRUIT\0VEGETABLE"] = "cabbage"
+        newenv = env_copy_with(**{"FRUIT\0VEGETABLE": "cabbage"})
         with self.assertRaises(ValueError):
             subprocess.Popen(ZERO_RETURN_CMD, env=newenv)
 
         # null character in the environment variable value
-        newenv = os.environ.copy()
-        newenv["FRUIT"] = "orange\0VEGETABLE=cabbage"
+        newenv = env_copy_with(FRUIT="orange\0VEGETABLE=cabbage")
         with self.assertRaises(ValueError):
             subprocess.Popen(ZERO_RETURN_CMD, env=newenv)
 
         # equal character in the environment variable name
-        newenv = os.environ.copy()
-        newenv["FRUIT=ORANGE"] = "lemon"
+        newenv = env_copy_with(**{"FRUIT=ORANGE": "lemon"})
         with self.assertRaises(ValueError):
             subprocess.Popen(ZERO_RETURN_CMD, env=newenv)
 
         # equal character in the environment variable value
-        newenv = os.environ.copy()
-        newenv["FRUIT"] = "orange=lemon"
+        newenv = env_copy_with(FRUIT="orange=lemon")
         with subprocess.Popen([sys.executable, "-c",
                                'import sys, os;'
                                'sys.stdout.write(os.getenv("FRUIT"))'],
@@ -898,13 +918,11 @@ class ProcessTestCase(BaseTestCase):
     @unittest.skipUnless(sys.platform == "win32", "Windows only issue")
     def test_win32_invalid_env(self):
         # '=' in the environment variable name
-        newenv = os.environ.copy()
-        newenv["FRUIT=VEGETABLE"] = "cabbage"
+        newenv = env_copy_with(**{"FRUIT=VEGETABLE": "cabbage"})
         with self.assertRaises(ValueError):
             subprocess.Popen(ZERO_RETURN_CMD, env=newenv)
 
-        newenv = os.environ.copy()
-        newenv["==FRUIT"] = "cabbage"
+        newenv = env_copy_with(**{"==FRUIT": "cabbage"})
         with self.assertRaises(ValueError):
             subprocess.Popen(ZERO_RETURN_CMD, env=newenv)
 
@@ -1017,9 +1035,6 @@ class ProcessTestCase(BaseTestCase):
         # communicate() with writes larger than pipe_buf
         # This test will probably deadlock rather than fail, if
         # communicate() does not work properly.
-        x, y = os.pipe()
-        os.close(x)
-        os.close(y)
         p = subprocess.Popen([sys.executable, "-c",
                               'import sys,os;'
                               'sys.stdout.write(sys.stdin.read(47));'
@@ -1253,22 +1268,19 @@ class ProcessTestCase(BaseTestCase):
             shutil.rmtree(tmpdir)
 
     def test_list2cmdline(self):
-        self.assertEqual(subprocess.list2cmdline(['a b c', 'd', 'e']),
-                         '"a b c" d e')
-        self.assertEqual(subprocess.list2cmdline(['ab"c', '\\', 'd']),
-                         'ab\\"c \\ d')
-        self.assertEqual(subprocess.list2cmdline(['ab"c', ' \\', 'd']),
-                         'ab\\"c " \\\\" d')
-        self.assertEqual(subprocess.list2cmdline(['a\\\\\\b', 'de fg', 'h']),
-                         'a\\\\\\b "de fg" h')
-        self.assertEqual(subprocess.list2cmdline(['a\\"b', 'c', 'd']),
-                         'a\\\\\\"b c d')
-        self.assertEqual(subprocess.list2cmdline(['a\\\\b c', 'd', 'e']),
-                         '"a\\\\b c" d e')
-        self.assertEqual(subprocess.list2cmdline(['a\\\\b\\ c', 'd', 'e']),
-                         '"a\\\\b\\ c" d e')
-        self.assertEqual(subprocess.list2cmdline(['ab', '']),
-                         'ab ""')
+        cases = [
+            (['a b c', 'd', 'e'], '"a b c" d e'),
+            (['ab"c', '\\', 'd'], 'ab\\"c \\ d'),
+            (['ab"c', ' \\', 'd'], 'ab\\"c " \\\\" d'),
+            (['a\\\\\\b', 'de fg', 'h'], 'a\\\\\\b "de fg" h'),
+            (['a\\"b', 'c', 'd'], 'a\\\\\\"b c d'),
+            (['a\\\\b c', 'd', 'e'], '"a\\\\b c" d e'),
+            (['a\\\\b\\ c', 'd', 'e'], '"a\\\\b\\ c" d e'),
+            (['ab', ''], 'ab ""'),
+        ]
+        for args, expected in cases:
+            with self.subTest(args=args):
+                self.assertEqual(subprocess.list2cmdline(args), expected)
 
     def test_poll(self):
         p = subprocess.Popen([sys.executable, "-c",
@@ -1667,7 +1679,7 @@ class RunFuncTestCase(BaseTestCase):
 
     def test_check_output_stdin_arg(self):
         # run() can be called with stdin set to a file
-        tf = tempfile.TemporaryFile()
+        tf = scratch_file()
         self.addCleanup(tf.close)
         tf.write(b'pear')
         tf.seek(0)
@@ -1685,7 +1697,7 @@ class RunFuncTestCase(BaseTestCase):
 
     def test_check_output_stdin_with_input_arg(self):
         # run() refuses to accept 'stdin' with 'input'
-        tf = tempfile.TemporaryFile()
+        tf = scratch_file()
         self.addCleanup(tf.close)
         tf.write(b'pear')
         tf.seek(0)
@@ -1712,8 +1724,7 @@ class RunFuncTestCase(BaseTestCase):
         self.assertEqual(c.exception.stdout, b'BDFL')
 
     def test_run_kwargs(self):
-        newenv = os.environ.copy()
-        newenv["FRUIT"] = "banana"
+        newenv = env_copy_with(FRUIT="banana")
         cp = self.run_python(('import sys, os;'
                       'sys.exit(33 if os.getenv("FRUIT")=="banana" else 31)'),
                              env=newenv)
@@ -1772,7 +1783,7 @@ class RunFuncTestCase(BaseTestCase):
 
     def test_stdout_with_capture_output_arg(self):
         # run() refuses to accept 'stdout' with 'capture_output'
-        tf = tempfile.TemporaryFile()
+        tf = scratch_file()
         self.addCleanup(tf.close)
         with self.assertRaises(ValueError,
             msg=("Expected ValueError when stdout and capture_output "
@@ -1784,7 +1795,7 @@ class RunFuncTestCase(BaseTestCase):
 
     def test_stderr_with_capture_output_arg(self):
         # run() refuses to accept 'stderr' with 'capture_output'
-        tf = tempfile.TemporaryFile()
+        tf = scratch_file()
         self.addCleanup(tf.close)
         with self.assertRaises(ValueError,
             msg=("Expected ValueError when stderr and capture_output "
@@ -2332,9 +2343,9 @@ class POSIXProcessTestCase(BaseTestCase):
         fd, fname = tempfile.mkstemp()
         # reopen in text mode
         with open(fd, "w", errors="surrogateescape") as fobj:
-            fobj.write("#!%s\n" % support.unix_shell)
-            fobj.write("exec '%s' -c 'import sys; sys.exit(47)'\n" %
-                       sys.executable)
+            fobj.write("#!%s\n"
+                       "exec '%s' -c 'import sys; sys.exit(47)'\n"
+                       % (support.unix_shell, sys.executable))
         os.chmod(fname, 0o700)
         p = subprocess.Popen(fname)
         p.wait()
@@ -2354,8 +2365,7 @@ class POSIXProcessTestCase(BaseTestCase):
 
     def test_shell_sequence(self):
         # Run command through the shell (sequence)
-        newenv = os.environ.copy()
-        newenv["FRUIT"] = "apple"
+        newenv = env_copy_with(FRUIT="apple")
         p = subprocess.Popen(["echo $FRUIT"], shell=1,
                              stdout=subprocess.PIPE,
                              env=newenv)
@@ -2364,8 +2374,7 @@ class POSIXProcessTestCase(BaseTestCase):
 
     def test_shell_string(self):
         # Run command through the shell (string)
-        newenv = os.environ.copy()
-        newenv["FRUIT"] = "apple"
+        newenv = env_copy_with(FRUIT="apple")
         p = subprocess.Popen("echo $FRUIT", shell=1,
                              stdout=subprocess.PIPE,
                              env=newenv)
@@ -2377,9 +2386,9 @@ class POSIXProcessTestCase(BaseTestCase):
         fd, fname = tempfile.mkstemp()
         # reopen in text mode
         with open(fd, "w", errors="surrogateescape") as fobj:
-            fobj.write("#!%s\n" % support.unix_shell)
-            fobj.write("exec '%s' -c 'import sys; sys.exit(47)'\n" %
-                       sys.executable)
+            fobj.write("#!%s\n"
+                       "exec '%s' -c 'import sys; sys.exit(47)'\n"
+                       % (support.unix_shell, sys.executable))
         os.chmod(fname, 0o700)
         rc = subprocess.call(fname)
         os.remove(fname)
@@ -2670,7 +2679,7 @@ class POSIXProcessTestCase(BaseTestCase):
         saved_fds = self._save_fds(range(3))
         try:
             for from_fd in from_fds:
-                with tempfile.TemporaryFile() as f:
+                with scratch_file() as f:
                     os.dup2(f.fileno(), from_fd)
 
             fd_to_close = (set(range(3)) - set(from_fds)).pop()
@@ -2779,8 +2788,7 @@ class POSIXProcessTestCase(BaseTestCase):
         self.assertEqual(exitcode, 0)
 
         # bytes program, unicode PATH
-        env = os.environ.copy()
-        env["PATH"] = path
+        env = env_copy_with(PATH=path)
         exitcode = subprocess.call([program]+args, env=env)
         self.assertEqual(exitcode, 0)
 
@@ -3661,8 +3669,7 @@ class Win32ProcessTestCase(BaseTestCase):
 
     def test_shell_sequence(self):
         # Run command through the shell (sequence)
-        newenv = os.environ.copy()
-        newenv["FRUIT"] = "physalis"
+        newenv = env_copy_with(FRUIT="physalis")
         p = subprocess.Popen(["set"], shell=1,
                              stdout=subprocess.PIPE,
                              env=newenv)
@@ -3671,8 +3678,7 @@ class Win32ProcessTestCase(BaseTestCase):
 
     def test_shell_string(self):
         # Run command through the shell (string)
-        newenv = os.environ.copy()
-        newenv["FRUIT"] = "physalis"
+        newenv = env_copy_with(FRUIT="physalis")
         p = subprocess.Popen("set", shell=1,
                              stdout=subprocess.PIPE,
                              env=newenv)
@@ -3682,8 +3688,7 @@ class Win32ProcessTestCase(BaseTestCase):
     def test_shell_encodings(self):
         # Run command through the shell (string)
         for enc in ['ansi', 'oem']:
-            newenv = os.environ.copy()
-            newenv["FRUIT"] = "physalis"
+            newenv = env_copy_with(FRUIT="physalis")
             p = subprocess.Popen("set", shell=1,
                                  stdout=subprocess.PIPE,
                                  env=newenv,
@@ -206,26 +206,18 @@ class SysModuleTest(unittest.TestCase):
         self.assertEqual(out, b'')
         self.assertEqual(err, b'')
 
-        # call with integer argument
-        with self.assertRaises(SystemExit) as cm:
-            sys.exit(42)
-        self.assertEqual(cm.exception.code, 42)
-
-        # call with tuple argument with one entry
-        # entry will be unpacked
-        with self.assertRaises(SystemExit) as cm:
-            sys.exit((42,))
-        self.assertEqual(cm.exception.code, 42)
-
-        # call with string argument
-        with self.assertRaises(SystemExit) as cm:
-            sys.exit("exit")
-        self.assertEqual(cm.exception.code, "exit")
-
-        # call with tuple argument with two entries
-        with self.assertRaises(SystemExit) as cm:
-            sys.exit((17, 23))
-        self.assertEqual(cm.exception.code, (17, 23))
+        # call with an integer, a one-entry tuple (which is unpacked),
+        # a string, and a two-entry tuple argument
+        for arg, expected in (
+            (42, 42),
+            ((42,), 42),
+            ("exit", "exit"),
+            ((17, 23), (17, 23)),
+        ):
+            with self.subTest(arg=arg):
+                with self.assertRaises(SystemExit) as cm:
+                    sys.exit(arg)
+                self.assertEqual(cm.exception.code, expected)
 
         # test that the exit machinery handles SystemExits properly
         rc, out, err = assert_python_failure('-c', 'raise SystemExit(47)')
@@ -399,23 +391,24 @@ class SysModuleTest(unittest.TestCase):
         # which will add a copy of any locals to the frame object, causing
         # the reference count to increase by 2 instead of 1.
         global n
-        self.assertRaises(TypeError, sys.getrefcount)
-        c = sys.getrefcount(None)
+        # Bind the C function locally so the repeated queries don't go
+        # through the sys module dict.
+        getrefcount = sys.getrefcount
+        self.assertRaises(TypeError, getrefcount)
+        c = getrefcount(None)
         n = None
         # Singleton refcnts don't change
-        self.assertEqual(sys.getrefcount(None), c)
+        self.assertEqual(getrefcount(None), c)
         del n
-        self.assertEqual(sys.getrefcount(None), c)
+        self.assertEqual(getrefcount(None), c)
         if hasattr(sys, "gettotalrefcount"):
             self.assertIsInstance(sys.gettotalrefcount(), int)
 
     def test_getframe(self):
         self.assertRaises(TypeError, sys._getframe, 42, 42)
         self.assertRaises(ValueError, sys._getframe, 2000000000)
-        self.assertTrue(
-            SysModuleTest.test_getframe.__code__ \
-            is sys._getframe().f_code
-        )
+        self.assertIs(SysModuleTest.test_getframe.__code__,
+                      sys._getframe().f_code)
 
     def test_getframemodulename(self):
         # Default depth gets ourselves
@@ -1398,12 +1391,15 @@ class UnraisableHookTest(unittest.TestCase):
 @test.support.cpython_only
 class SizeofTest(unittest.TestCase):
 
-    def setUp(self):
-        self.P = struct.calcsize('P')
-        self.longdigit = sys.int_info.sizeof_digit
+    @classmethod
+    def setUpClass(cls):
+        # These are process-wide constants; compute them once for the
+        # whole class instead of re-deriving them in every test.
+        cls.P = struct.calcsize('P')
+        cls.longdigit = sys.int_info.sizeof_digit
         _testinternalcapi = import_helper.import_module("_testinternalcapi")
-        self.gc_headsize = _testinternalcapi.SIZEOF_PYGC_HEAD
-        self.managed_pre_header_size = _testinternalcapi.SIZEOF_MANAGED_PRE_HEADER
+        cls.gc_headsize = _testinternalcapi.SIZEOF_PYGC_HEAD
+        cls.managed_pre_header_size = _testinternalcapi.SIZEOF_MANAGED_PRE_HEADER
 
     check_sizeof = test.support.check_sizeof
 
@@ -1700,24 +1696,27 @@ class SizeofTest(unittest.TestCase):
         asciifields = "nnb"
         compactfields = asciifields + "nP"
         unicodefields = compactfields + "P"
+        # the header sizes are loop-invariant; compute them once
+        asciisize = size(asciifields)
+        compactsize = size(compactfields)
         for s in samples:
             maxchar = ord(max(s))
             if maxchar < 128:
-                L = size(asciifields) + len(s) + 1
+                L = asciisize + len(s) + 1
             elif maxchar < 256:
-                L = size(compactfields) + len(s) + 1
+                L = compactsize + len(s) + 1
             elif maxchar < 65536:
-                L = size(compactfields) + 2*(len(s) + 1)
+                L = compactsize + 2*(len(s) + 1)
             else:
-                L = size(compactfields) + 4*(len(s) + 1)
+                L = compactsize + 4*(len(s) + 1)
             check(s, L)
         # verify that the UTF-8 size is accounted for
         s = chr(0x4000)   # 4 bytes canonical representation
-        check(s, size(compactfields) + 4)
+        check(s, compactsize + 4)
         # compile() will trigger the generation of the UTF-8
         # representation as a side effect
         compile(s, "<stdin>", "eval")
-        check(s, size(compactfields) + 4 + 4)
+        check(s, compactsize + 4 + 4)
         # TODO: add check that forces the presence of wchar_t representation
         # TODO: add check that forces layout of unicodefields
         # weakref